@@ -7,45 +7,138 @@ Uses Langchain to connect to the ExL system via its OpenAI-compatible API.
 import os
 import sys
 import time
+import atexit
+import asyncio
 import argparse
-from typing import Dict, List, Any, Optional
+import threading
+import functools
+import contextlib
+from collections import deque
+from dataclasses import dataclass, fields, replace
+from typing import Deque, Dict, List, Any, Optional, Tuple
 from dotenv import load_dotenv
 
-# Try to import langchain-openai, fall back to openllm if it fails
-try:
-    from langchain_openai import ChatOpenAI
-    USING_OPENAI = True
-    print("Using langchain-openai integration")
-except ImportError:
+@dataclass(frozen=True)
+class EIRDefaults:
+    """Default ExL configuration, loaded once from the environment."""
+    api_url: str = "http://localhost:3000"
+    api_key: str = "dummy-api-key"  # ExL doesn't require a real API key
+    speaker_model: str = "gpt-4o"
+    speaker_model_provider: str = "openai"
+    speaker_api_key: str = ""
+    speaker_api_base: str = ""
+    executive_model: str = "gpt-4o"
+    executive_model_provider: str = "openai"
+    executive_api_key: str = ""
+    executive_api_base: str = ""
+
+    @classmethod
+    def from_env(cls) -> "EIRDefaults":
+        """Build defaults from environment variables, keeping built-ins for unset ones."""
+        env = os.environ
+        return cls(
+            api_url=env.get("EXL_API_URL", cls.api_url),
+            api_key=env.get("EXL_API_KEY", cls.api_key),
+            speaker_model=env.get("SPEAKER_MODEL", cls.speaker_model),
+            speaker_model_provider=env.get("SPEAKER_MODEL_PROVIDER", cls.speaker_model_provider),
+            speaker_api_key=env.get("SPEAKER_API_KEY", cls.speaker_api_key),
+            speaker_api_base=env.get("SPEAKER_API_BASE", cls.speaker_api_base),
+            executive_model=env.get("EXECUTIVE_MODEL", cls.executive_model),
+            executive_model_provider=env.get("EXECUTIVE_MODEL_PROVIDER", cls.executive_model_provider),
+            executive_api_key=env.get("EXECUTIVE_API_KEY", cls.executive_api_key),
+            executive_api_base=env.get("EXECUTIVE_API_BASE", cls.executive_api_base),
+        )
+
+@functools.lru_cache(maxsize=1)
+def load_defaults() -> EIRDefaults:
+    """Load .env and the environment once, after argument parsing."""
+    load_dotenv()
+    return EIRDefaults.from_env()
+
+def resolve_config(
+    overrides: Dict[str, Optional[str]],
+    defaults: Optional[EIRDefaults] = None
+) -> EIRDefaults:
+    """Merge overrides onto defaults (the environment, if not given).
+
+    Each EIRDefaults field is taken from overrides when set there to a
+    non-empty value, otherwise from defaults.
+    """
+    defaults = defaults or load_defaults()
+    return replace(defaults, **{f.name: overrides[f.name] for f in fields(defaults) if overrides.get(f.name)})
+
+SYSTEM_PROMPT = "You are a helpful assistant powered by the Executive Layer (ExL) system."
+
+# On-disk response cache; only used for near-deterministic temperatures
+CACHE_PATH = ".eir_cache.sqlite"
+CACHE_MAX_TEMPERATURE = 0.3
+
+# Input history file used when prompt_toolkit is available
+HISTORY_PATH = ".eir_history"
+
+# Minimum time between stdout flushes while streaming (~one frame)
+STREAM_FLUSH_INTERVAL = 0.016
+
+# Rough characters-per-token ratio used to estimate conversation size
+CHARS_PER_TOKEN = 4
+
+@functools.lru_cache(maxsize=1)
+def _get_http_clients() -> Tuple[Any, Any]:
+    """Create the shared (sync, async) httpx clients on first use.
+
+    Every turn reuses the same keep-alive connection to the ExL API instead
+    of re-negotiating TCP/TLS each time.
+    """
+    import httpx
+    limits = httpx.Limits(max_connections=16, max_keepalive_connections=16, keepalive_expiry=30.0)
+    timeout = httpx.Timeout(60.0, connect=10.0)
+    pooled_client = httpx.Client(limits=limits, timeout=timeout)
+    pooled_async_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+    atexit.register(pooled_client.close)
+    return pooled_client, pooled_async_client
+
+# Which backend _load_backend picked; None until the first call
+USING_OPENAI: Optional[bool] = None
+
+@functools.lru_cache(maxsize=1)
+def _load_backend() -> Any:
+    """Import the chat model backend on first use and return its model class.
+
+    The heavy LangChain imports are deferred so that `--help` and argument
+    errors return without paying for them.
+    """
+    global USING_OPENAI
+    # Try to import langchain-openai, fall back to openllm if it fails
     try:
-        from openllm import OpenLLM
-        USING_OPENAI = False
-        print("Falling back to OpenLLM integration")
+        from langchain_openai import ChatOpenAI
+        model_class = ChatOpenAI
+        USING_OPENAI = True
+        print("Using langchain-openai integration")
     except ImportError:
-        print("Error: Neither langchain-openai nor openllm could be imported.")
-        print("Please install the required packages:")
-        print("pip install langchain langchain-openai python-dotenv")
-        print("or")
-        print("pip install langchain openllm python-dotenv")
-        sys.exit(1)
-
-from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
-from langchain.schema import HumanMessage, SystemMessage, AIMessage
+        try:
+            from openllm import OpenLLM
+            model_class = OpenLLM
+            USING_OPENAI = False
+            print("Falling back to OpenLLM integration")
+        except ImportError:
+            print("Error: Neither langchain-openai nor openllm could be imported.")
+            _exit_missing_packages()
 
-# Load environment variables
-load_dotenv()
+    # main() also needs the core langchain package for message types
+    try:
+        import langchain  # noqa: F401
+    except ImportError:
+        print("Error: langchain could not be imported.")
+        _exit_missing_packages()
+    return model_class
 
-# Default configuration from environment variables
-EXL_API_URL = os.getenv("EXL_API_URL", "http://localhost:3000")
-EXL_API_KEY = os.getenv("EXL_API_KEY", "dummy-api-key")  # ExL doesn't require a real API key
-SPEAKER_MODEL = os.getenv("SPEAKER_MODEL", "gpt-4o")
-SPEAKER_MODEL_PROVIDER = os.getenv("SPEAKER_MODEL_PROVIDER", "openai")
-SPEAKER_API_KEY = os.getenv("SPEAKER_API_KEY", "")
-SPEAKER_API_BASE = os.getenv("SPEAKER_API_BASE", "")
-EXECUTIVE_MODEL = os.getenv("EXECUTIVE_MODEL", "gpt-4o")
-EXECUTIVE_MODEL_PROVIDER = os.getenv("EXECUTIVE_MODEL_PROVIDER", "openai")
-EXECUTIVE_API_KEY = os.getenv("EXECUTIVE_API_KEY", "")
-EXECUTIVE_API_BASE = os.getenv("EXECUTIVE_API_BASE", "")
+def _exit_missing_packages() -> None:
+    """Print install instructions and exit."""
+    print("Please install the required packages:")
+    print("pip install langchain langchain-openai python-dotenv")
+    print("or")
+    print("pip install langchain openllm python-dotenv")
+    sys.exit(1)
 
 # ANSI color codes for terminal output
 COLORS = {
@@ -59,70 +152,86 @@ COLORS = {
     "magenta": "\033[35m",
 }
 
+# Precomputed (prefix, suffix) escape sequences for each color
+_COLOR_PAIRS = {k: (v, COLORS["reset"]) for k, v in COLORS.items()}
+
 def print_colored(text: str, color: str = "reset", end: str = "\n") -> None:
     """Print text with the specified color."""
-    print(f"{COLORS.get(color, COLORS['reset'])}{text}{COLORS['reset']}", end=end)
+    pre, post = _COLOR_PAIRS.get(color, ("", ""))
+    out = sys.stdout
+    if pre:
+        out.write(pre)
+        out.write(text)
+        out.write(post)
+    else:
+        out.write(text)
+    out.write(end)
+
+def render_colored(text: str, color: str = "reset") -> str:
+    """Return text wrapped in the escape codes for the specified color."""
+    pre, post = _COLOR_PAIRS.get(color, ("", ""))
+    return f"{pre}{text}{post}" if pre else text
+
+def print_colored_nostream(text: str, color: str = "reset", end: str = "\n") -> None:
+    """Print text with the specified color using a single write."""
+    sys.stdout.write(render_colored(text, color) + end)
+
+# Model configuration forwarded to ExL as x-<name> headers; each maps to an EIRDefaults field
+_HEADER_NAMES = (
+    "speaker-model",
+    "speaker-model-provider",
+    "speaker-api-key",
+    "speaker-api-base",
+    "executive-model",
+    "executive-model-provider",
+    "executive-api-key",
+    "executive-api-base",
+)
 
 def create_chat_model(
-    api_url: str = None,
-    api_key: str = None,
-    speaker_model: str = None,
-    speaker_model_provider: str = None,
-    speaker_api_key: str = None,
-    speaker_api_base: str = None,
-    executive_model: str = None,
-    executive_model_provider: str = None,
-    executive_api_key: str = None,
-    executive_api_base: str = None,
-    temperature: float = 0.7
+    *,
+    overrides: Optional[Dict[str, Optional[str]]] = None,
+    defaults: Optional[EIRDefaults] = None,
+    temperature: float = 0.7,
+    cache: bool = False
 ) -> Any:
-    """Create and configure the chat model based on available integrations."""
-    
+    """Create and configure the chat model based on available integrations.
+
+    The configuration is resolved with resolve_config(overrides, defaults);
+    pass an already resolved config as defaults with no overrides.
+
+    When cache is set, the langchain-openai model uses the global LLM cache.
+    LangChain only consults the cache on invoke/ainvoke, never on astream,
+    so callers should invoke a cached model rather than stream it.
+    """
     # Use provided values or fall back to defaults
-    api_url = api_url or EXL_API_URL
-    api_key = api_key or EXL_API_KEY
-    speaker_model = speaker_model or SPEAKER_MODEL
-    speaker_model_provider = speaker_model_provider or SPEAKER_MODEL_PROVIDER
-    speaker_api_key = speaker_api_key or SPEAKER_API_KEY
-    speaker_api_base = speaker_api_base or SPEAKER_API_BASE
-    executive_model = executive_model or EXECUTIVE_MODEL
-    executive_model_provider = executive_model_provider or EXECUTIVE_MODEL_PROVIDER
-    executive_api_key = executive_api_key or EXECUTIVE_API_KEY
-    executive_api_base = executive_api_base or EXECUTIVE_API_BASE
+    config = resolve_config(overrides or {}, defaults)
+    api_url = config.api_url
+    api_key = config.api_key
     
     # Prepare headers for custom configuration
-    headers = {}
-    if speaker_model:
-        headers["x-speaker-model"] = speaker_model
-    if speaker_model_provider:
-        headers["x-speaker-model-provider"] = speaker_model_provider
-    if speaker_api_key:
-        headers["x-speaker-api-key"] = speaker_api_key
-    if speaker_api_base:
-        headers["x-speaker-api-base"] = speaker_api_base
-    if executive_model:
-        headers["x-executive-model"] = executive_model
-    if executive_model_provider:
-        headers["x-executive-model-provider"] = executive_model_provider
-    if executive_api_key:
-        headers["x-executive-api-key"] = executive_api_key
-    if executive_api_base:
-        headers["x-executive-api-base"] = executive_api_base
+    vals = (getattr(config, n.replace("-", "_")) for n in _HEADER_NAMES)
+    headers = {f"x-{n}": v for n, v in zip(_HEADER_NAMES, vals) if v}
     
+    model_class = _load_backend()
     if USING_OPENAI:
         # Use langchain-openai integration
-        return ChatOpenAI(
+        pooled_client, pooled_async_client = _get_http_clients()
+        return model_class(
             model="eir-default",  # This can be any string, ExL will handle it
             openai_api_key=api_key,
             openai_api_base=f"{api_url}/v1",
-            streaming=True,
-            callbacks=[StreamingStdOutCallbackHandler()],
+            streaming=not cache,
+            cache=cache,
             temperature=temperature,
-            default_headers=headers
+            default_headers=headers,
+            http_client=pooled_client,
+            http_async_client=pooled_async_client
         )
     else:
         # Fall back to OpenLLM
-        return OpenLLM(  # pylint: disable=used-before-assignment
+        from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
+        return model_class(
             model="eir-default",  # This can be any string, ExL will handle it
             api_key=api_key,
             base_url=f"{api_url}/v1",
@@ -147,99 +256,279 @@ def parse_arguments():
     parser.add_argument("--executive-api-key", help="Executive API key (default: from .env)")
     parser.add_argument("--executive-api-base", help="Executive API base URL (default: from .env)")
     parser.add_argument("--temperature", type=float, default=0.7, help="Temperature for response generation (default: 0.7)")
+    parser.add_argument("--max-history-tokens", type=int, default=4096, help="Approximate token budget for conversation history sent to ExL (default: 4096)")
+    parser.add_argument("--cache", dest="cache", action="store_true", default=True, help=f"Cache responses on disk when temperature <= {CACHE_MAX_TEMPERATURE}; cached responses are printed whole rather than streamed (default)")
+    parser.add_argument("--no-cache", dest="cache", action="store_false", help="Disable the on-disk response cache and always stream responses")
     
     return parser.parse_args()
 
-def main() -> None:
-    """Main function to run the chatbot."""
+def enable_response_cache() -> bool:
+    """Register the on-disk SQLite cache as the global LLM cache.
+
+    Returns False, after a warning, when langchain-community is not installed.
+    """
+    try:
+        from langchain_community.cache import SQLiteCache
+    except ImportError:
+        print_colored_nostream("Response cache disabled: install langchain-community to enable it.", "yellow")
+        return False
+    from langchain_core.globals import set_llm_cache
+    set_llm_cache(SQLiteCache(database_path=CACHE_PATH))
+    return True
+
+def trim_history(history: Deque[Any], max_tokens: int) -> None:
+    """Drop the oldest messages until the history fits the estimated token budget.
+
+    The most recent message is always kept so the current turn is never lost.
+    """
+    total_chars = sum(len(m.content) for m in history)
+    while len(history) > 1 and total_chars // CHARS_PER_TOKEN > max_tokens:
+        total_chars -= len(history.popleft().content)
+
+async def close_http_clients() -> None:
+    """Close the shared async client if it was ever created."""
+    if _get_http_clients.cache_info().currsize:
+        await _get_http_clients()[1].aclose()
+
+async def run_in_daemon_thread(func: Any, *args: Any) -> Any:
+    """Run a blocking call on a daemon thread and await its result.
+
+    Unlike the default executor, a daemon thread never holds up interpreter
+    shutdown, so Ctrl+C exits even while the call is still blocked.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def settle(setter: Any, value: Any) -> None:
+        # The awaiting task may have been cancelled in the meantime
+        if not future.done():
+            setter(value)
+
+    def worker() -> None:
+        try:
+            outcome = (future.set_result, func(*args))
+        except BaseException as e:
+            outcome = (future.set_exception, e)
+        try:
+            loop.call_soon_threadsafe(settle, *outcome)
+        except RuntimeError:
+            # The event loop is already closed; nobody is waiting for the result
+            pass
+
+    threading.Thread(target=worker, daemon=True).start()
+    return await future
+
+def read_stdin_line() -> str:
+    """Read one line from stdin, like input() without a prompt.
+
+    Reads the file descriptor directly so a reader blocked on a daemon thread
+    holds no lock on sys.stdin that would break interpreter shutdown.
+    """
+    fd = sys.stdin.fileno()
+    data = bytearray()
+    while True:
+        byte = os.read(fd, 1)
+        if not byte:
+            if not data:
+                raise EOFError
+            break
+        if byte == b"\n":
+            break
+        data += byte
+    return data.decode(sys.stdin.encoding or "utf-8", errors="replace").rstrip("\r")
+
+async def cancel_task(task: "asyncio.Task[Any]") -> None:
+    """Cancel a background task and wait for it to finish unwinding."""
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+
+async def prewarm_connection(api_url: str) -> None:
+    """Open a pooled connection to the ExL API so the first turn skips the handshake."""
+    try:
+        await _get_http_clients()[1].head(f"{api_url}/v1/models")
+    except Exception:
+        # Best effort only; a failure here will surface on the first real request
+        pass
+
+async def read_user_input(session: Any) -> str:
+    """Read a line from the user without blocking the event loop."""
+    if session is not None:
+        from prompt_toolkit.formatted_text import ANSI
+        return await session.prompt_async(ANSI(f"{COLORS['green']}You: {COLORS['reset']}"))
+    print_colored("You: ", "green", end="")
+    sys.stdout.flush()
+    return await run_in_daemon_thread(read_stdin_line)
+
+async def stream_response(chat_model: Any, messages: List[Any]) -> str:
+    """Stream the model's response to stdout and return the full text.
+
+    Flushes are coalesced to at most one per STREAM_FLUSH_INTERVAL seconds
+    rather than one per token.
+    """
+    out = sys.stdout
+    pieces = []
+    last_flush = time.monotonic()
+    async for chunk in chat_model.astream(messages):
+        text = chunk.content
+        out.write(text)
+        pieces.append(text)
+        now = time.monotonic()
+        if now - last_flush > STREAM_FLUSH_INTERVAL:
+            out.flush()
+            last_flush = now
+    out.flush()
+    return "".join(pieces)
+
+async def chat(cleanup: contextlib.AsyncExitStack) -> None:
+    """Run the interactive chat session, registering teardown steps on cleanup."""
     # Parse command line arguments
     args = parse_arguments()
+
+    # Deferred until after argument parsing to keep `--help` fast; _load_backend
+    # reports missing packages before anything else imports LangChain
+    _load_backend()
+    from langchain.schema import HumanMessage, SystemMessage, AIMessage
     
-    # Print welcome message
-    print_colored("\n=== Executive Layer (ExL) Chatbot ===", "bold")
-    print_colored("Type 'exit', 'quit', or press Ctrl+C to exit the chatbot.", "yellow")
-    print_colored("Type 'clear' to start a new conversation.", "yellow")
-    print()
+    # Resolve command line overrides against the environment once
+    config = resolve_config({
+        "api_url": args.api_url,
+        "api_key": args.api_key,
+        "speaker_model": args.speaker_model,
+        "speaker_model_provider": args.speaker_provider,
+        "speaker_api_key": args.speaker_api_key,
+        "speaker_api_base": args.speaker_api_base,
+        "executive_model": args.executive_model,
+        "executive_model_provider": args.executive_provider,
+        "executive_api_key": args.executive_api_key,
+        "executive_api_base": args.executive_api_base,
+    })
     
-    # Print configuration
-    print_colored("Configuration:", "cyan")
-    print_colored(f"API URL: {args.api_url or EXL_API_URL}", "cyan")
-    print_colored(f"Speaker Model: {args.speaker_model or SPEAKER_MODEL} ({args.speaker_provider or SPEAKER_MODEL_PROVIDER})", "cyan")
-    print_colored(f"Executive Model: {args.executive_model or EXECUTIVE_MODEL} ({args.executive_provider or EXECUTIVE_MODEL_PROVIDER})", "cyan")
-    print_colored(f"Temperature: {args.temperature}", "cyan")
-    print()
+    # Print welcome message and configuration in a single write
+    banner = "\n".join([
+        render_colored("\n=== Executive Layer (ExL) Chatbot ===", "bold"),
+        render_colored("Type 'exit', 'quit', or press Ctrl+C to exit the chatbot.", "yellow"),
+        render_colored("Type 'clear' to start a new conversation.", "yellow"),
+        "",
+        render_colored("Configuration:", "cyan"),
+        render_colored(f"API URL: {config.api_url}", "cyan"),
+        render_colored(f"Speaker Model: {config.speaker_model} ({config.speaker_model_provider})", "cyan"),
+        render_colored(f"Executive Model: {config.executive_model} ({config.executive_model_provider})", "cyan"),
+        render_colored(f"Temperature: {args.temperature}", "cyan"),
+        "",
+        "",
+    ])
+    sys.stdout.write(banner)
+    sys.stdout.flush()
+
+    # Only cache when sampling is close to deterministic, and only on the
+    # langchain-openai backend; set up the cache before creating the model
+    use_cache = (
+        args.cache
+        and args.temperature <= CACHE_MAX_TEMPERATURE
+        and USING_OPENAI
+        and enable_response_cache()
+    )
 
     # Create the chat model
     try:
         chat_model = create_chat_model(
-            api_url=args.api_url,
-            api_key=args.api_key,
-            speaker_model=args.speaker_model,
-            speaker_model_provider=args.speaker_provider,
-            speaker_api_key=args.speaker_api_key,
-            speaker_api_base=args.speaker_api_base,
-            executive_model=args.executive_model,
-            executive_model_provider=args.executive_provider,
-            executive_api_key=args.executive_api_key,
-            executive_api_base=args.executive_api_base,
-            temperature=args.temperature
+            defaults=config,
+            temperature=args.temperature,
+            cache=use_cache
         )
     except Exception as e:
-        print_colored(f"Error initializing chat model: {e}", "red")
-        print_colored("Make sure the ExL system is running (use 'make deploy').", "yellow")
+        print_colored_nostream(f"Error initializing chat model: {e}", "red")
+        print_colored_nostream("Make sure the ExL system is running (use 'make deploy').", "yellow")
         sys.exit(1)
 
-    # Initialize conversation history
-    messages = [
-        SystemMessage(content="You are a helpful assistant powered by the Executive Layer (ExL) system.")
-    ]
+    # Warm up the connection pool while the user types their first message. Only
+    # langchain-openai streams over the shared async client; OpenLLM manages its own.
+    if USING_OPENAI:
+        prewarm_task = asyncio.create_task(prewarm_connection(config.api_url))
+        # Cleanup runs in LIFO order, so this finishes before the client is closed
+        cleanup.push_async_callback(cancel_task, prewarm_task)
+
+    # Initialize conversation history; the system message is pinned outside the trimmed window
+    system_message = SystemMessage(content=SYSTEM_PROMPT)
+    history = deque()
+
+    # prompt_toolkit gives async-friendly input with history; fall back to input() without it
+    try:
+        from prompt_toolkit import PromptSession
+        from prompt_toolkit.history import FileHistory
+        from prompt_toolkit.patch_stdout import patch_stdout
+    except ImportError:
+        session = None
+        stdout_context = contextlib.nullcontext()
+    else:
+        session = PromptSession(history=FileHistory(HISTORY_PATH))
+        # Route output through prompt_toolkit so streamed text doesn't collide with the prompt line
+        stdout_context = patch_stdout(raw=True)
 
     # Main conversation loop
-    while True:
-        try:
-            # Get user input
-            print_colored("\nYou: ", "green", end="")
-            user_input = input()
+    with stdout_context:
+        while True:
+            try:
+                # Get user input without blocking the event loop
+                print()
+                user_input = await read_user_input(session)
 
-            # Check for exit commands
-            if user_input.lower() in ["exit", "quit"]:
-                print_colored("Goodbye!", "blue")
-                break
+                # Check for exit commands
+                if user_input.lower() in ["exit", "quit"]:
+                    print_colored_nostream("Goodbye!", "blue")
+                    break
 
-            # Check for clear command
-            if user_input.lower() == "clear":
-                messages = [
-                    SystemMessage(content="You are a helpful assistant powered by the Executive Layer (ExL) system.")
-                ]
-                print_colored("Conversation history cleared.", "blue")
-                continue
+                # Check for clear command
+                if user_input.lower() == "clear":
+                    history.clear()
+                    print_colored_nostream("Conversation history cleared.", "blue")
+                    continue
 
-            # Add user message to history
-            messages.append(HumanMessage(content=user_input))
+                # Add user message to history and keep the outgoing window bounded
+                history.append(HumanMessage(content=user_input))
+                trim_history(history, args.max_history_tokens)
+                messages = [system_message] + list(history)
 
-            # Print assistant response
-            print_colored("Assistant: ", "blue", end="")
+                # Print assistant response
+                print_colored("Assistant: ", "blue", end="")
             
-            # Get response from the model
-            if USING_OPENAI:
-                response = chat_model.invoke(messages)
-                # Response is already streamed by the callback handler
-                # Add the response to the conversation history
-                messages.append(AIMessage(content=response.content))
-            else:
-                # For OpenLLM, we need to handle streaming differently
-                response = chat_model.invoke(messages)
-                # Add the response to the conversation history
-                messages.append(AIMessage(content=response))
-
-            print()  # Add a newline after the response
-
-        except KeyboardInterrupt:
-            print_colored("\nGoodbye!", "blue")
-            break
-        except Exception as e:
-            print_colored(f"\nError: {e}", "red")
-            print_colored("Make sure the ExL system is running (use 'make deploy').", "yellow")
+                # Get response from the model
+                if use_cache:
+                    # The LLM cache is only checked on ainvoke, so don't stream cached models
+                    response = (await chat_model.ainvoke(messages)).content
+                    sys.stdout.write(response)
+                    sys.stdout.flush()
+                    history.append(AIMessage(content=response))
+                elif USING_OPENAI:
+                    response = await stream_response(chat_model, messages)
+                    # Add the response to the conversation history
+                    history.append(AIMessage(content=response))
+                else:
+                    # OpenLLM has no astream, so keep it on the sync path in a worker thread
+                    response = await run_in_daemon_thread(chat_model.invoke, messages)
+                    # Add the response to the conversation history
+                    history.append(AIMessage(content=response))
+                trim_history(history, args.max_history_tokens)
+
+                print()  # Add a newline after the response
+
+            except (KeyboardInterrupt, EOFError):
+                print_colored_nostream("\nGoodbye!", "blue")
+                break
+            except Exception as e:
+                print_colored_nostream(f"\nError: {e}", "red")
+                print_colored_nostream("Make sure the ExL system is running (use 'make deploy').", "yellow")
+
+async def main() -> None:
+    """Main function to run the chatbot."""
+    # Teardown runs on normal exit, sys.exit during startup, and Ctrl+C cancellation
+    async with contextlib.AsyncExitStack() as cleanup:
+        cleanup.push_async_callback(close_http_clients)
+        await chat(cleanup)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print_colored_nostream("\nGoodbye!", "blue")
\ No newline at end of file